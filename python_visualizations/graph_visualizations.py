@@ -6,10 +6,32 @@ Creates network visualizations using different layouts
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import plotly.graph_objects as go
 import numpy as np
+from scipy.optimize import minimize
+from scipy.sparse.csgraph import shortest_path
 from pathlib import Path
-import re
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import hashlib
+import os
+
+from pajek import read_pajek
+
+# Numba-compiled Fruchterman-Reingold, optional
+try:
+    from fr_numba import fr_layout
+except ImportError:
+    fr_layout = None
+
+# GPU analytics through the nx-cugraph NetworkX backend, optional
+# (pip install nx-cugraph-cu12)
+try:
+    import nx_cugraph  # noqa: F401
+    GRAPH_BACKEND = 'cugraph'
+except ImportError:
+    GRAPH_BACKEND = None
 
 # Set up paths
 BASE_PATH = Path(__file__).parent.parent
@@ -17,48 +39,176 @@ DATA_PATH = BASE_PATH / "datasets" / "graph"
 OUTPUT_PATH = BASE_PATH / "outputs"
 OUTPUT_PATH.mkdir(exist_ok=True)
 
+# Cached layout positions, kept out of the deliverables in outputs/
+CACHE_PATH = BASE_PATH / ".cache" / "layouts"
+
+# PNG resolution (override with VIZDASH_DPI) and Agg path simplification
+SAVE_DPI = int(os.environ.get('VIZDASH_DPI', 150))
+plt.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000,
+})
+
+# Source nodes sampled for approximate betweenness centrality
+BETWEENNESS_SAMPLES = 128
+
+# Above this many nodes all-pairs distances are estimated from sampled sources
+SHORTEST_PATH_MAX_NODES = 10000
+SHORTEST_PATH_SAMPLES = 1000
+
+# Above this many nodes labels are unreadable, so they are not drawn
+LABEL_MAX_NODES = 200
+
 def parse_pajek_net_file(filepath):
     """Parse Pajek .net file format"""
     print(f"Parsing {filepath.name}...")
     
-    G = nx.Graph()
-    
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-    
-    mode = None
-    for line in lines:
-        line = line.strip()
-        
-        if line.startswith('*Vertices'):
-            mode = 'vertices'
-            continue
-        elif line.startswith('*Edges') or line.startswith('*Arcs'):
-            mode = 'edges'
-            continue
-        
-        if mode == 'vertices' and line:
-            # Parse vertex: ID "Label" x y z
-            parts = line.split()
-            if len(parts) >= 2:
-                node_id = int(parts[0])
-                # Extract label from quotes if present
-                label_match = re.search(r'"([^"]*)"', line)
-                label = label_match.group(1) if label_match else parts[1]
-                G.add_node(node_id, label=label)
-        
-        elif mode == 'edges' and line:
-            # Parse edge: source target weight
-            parts = line.split()
-            if len(parts) >= 2:
-                source = int(parts[0])
-                target = int(parts[1])
-                weight = float(parts[2]) if len(parts) > 2 else 1.0
-                G.add_edge(source, target, weight=weight)
+    G = read_pajek(filepath)
     
     print(f"Loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
     return G
 
+def spring_layout(G, k=None, iterations=50, seed=None):
+    """Force-directed layout, JIT-compiled when Numba is installed"""
+    if fr_layout is not None:
+        return fr_layout(G, k=k, iterations=iterations, seed=seed)
+    return nx.spring_layout(G, k=k, iterations=iterations, seed=seed)
+
+def kamada_kawai_fast(G, maxiter=200):
+    """Kamada-Kawai stress layout from C-coded all-pairs shortest paths and L-BFGS-B"""
+    nodes = list(G.nodes())
+    n = len(nodes)
+    if n < 3:
+        return nx.circular_layout(G)
+    
+    # Weighted distances between all pairs, as nx.kamada_kawai_layout(G) uses the
+    # 'weight' attribute (1 when missing); disconnected pairs sit just beyond the diameter
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='weight', format='csr')
+    D = shortest_path(A, directed=False)
+    finite = np.isfinite(D)
+    D[~finite] = D[finite].max() + 1
+    np.fill_diagonal(D, np.inf)
+    inv_d2 = 1.0 / D**2
+    
+    def stress(x):
+        """Stress energy and its analytical gradient over flattened (N, 2) positions"""
+        p = x.reshape(n, 2)
+        delta = p[:, None, :] - p[None, :, :]
+        dist = np.sqrt((delta**2).sum(axis=-1))
+        np.fill_diagonal(dist, 1.0)
+        diff = dist - D
+        diff[~np.isfinite(diff)] = 0.0
+        energy = 0.25 * (inv_d2 * diff**2).sum()
+        grad = ((inv_d2 * diff / dist)[:, :, None] * delta).sum(axis=1)
+        return energy, grad.ravel()
+    
+    circular = nx.circular_layout(G)
+    x0 = np.array([circular[node] for node in nodes]).ravel()
+    result = minimize(stress, x0, jac=True, method='L-BFGS-B', options={'maxiter': maxiter})
+    
+    pos = nx.rescale_layout(result.x.reshape(n, 2))
+    return dict(zip(nodes, pos))
+
+def kamada_kawai_layout(G):
+    """Cached Kamada-Kawai layout, falling back to a cached spring layout if it fails"""
+    try:
+        # Kamada-Kawai layout (good for small to medium graphs)
+        return compute_or_load_layout(G, "kamada_kawai", kamada_kawai_fast)
+    except Exception:
+        # The fallback is cached under its own key, so the next run retries Kamada-Kawai
+        print("Kamada-Kawai failed, using spring layout")
+        return compute_or_load_layout(G, "spring", spring_layout, seed=42)
+
+def with_backend(func, G, **kwargs):
+    """Run a NetworkX algorithm on the cuGraph backend when installed, else on CPU"""
+    if GRAPH_BACKEND is not None:
+        try:
+            return func(G, backend=GRAPH_BACKEND, **kwargs)
+        except NotImplementedError:
+            pass
+    return func(G, **kwargs)
+
+def node_metric_arrays(G):
+    """Degree and clustering vectors (in G.nodes() order) from one CSR adjacency"""
+    A = nx.to_scipy_sparse_array(G, weight=None, dtype=np.float32, format='csr')
+    
+    # Like G.degree(), a self-loop counts twice: once in the row sum, once more from the diagonal
+    degrees = (np.asarray(A.sum(axis=1)).ravel() + A.diagonal()).astype(np.int32)
+    
+    # Clustering ignores self-loops (as nx.clustering does), so strip the diagonal
+    A.setdiag(0)
+    A.eliminate_zeros()
+    neighbors = np.asarray(A.sum(axis=1)).ravel()
+    
+    # Triangles through each node: row sums of (A @ A) masked by A, halved
+    triangles = np.asarray((A @ A).multiply(A).sum(axis=1)).ravel() / 2
+    clustering = 2 * triangles / np.maximum(neighbors * (neighbors - 1), 1)
+    return degrees, clustering
+
+def compute_betweenness(G):
+    """Betweenness centrality estimated from a sample of source nodes, O(kE)"""
+    k = min(G.number_of_nodes(), BETWEENNESS_SAMPLES)
+    centrality = with_backend(nx.betweenness_centrality, G, k=k, normalized=True, seed=42)
+    return np.fromiter((centrality[node] for node in G.nodes()), dtype=np.float64,
+                       count=G.number_of_nodes())
+
+def shortest_path_stats(G):
+    """Average shortest path length and diameter of a connected graph from one C-coded BFS pass"""
+    A = nx.to_scipy_sparse_array(G, weight=None, format='csr')
+    n = A.shape[0]
+    
+    # A single node has no pairs; networkx reports 0 for both
+    if n <= 1:
+        return 0.0, 0, True
+    
+    # Dense distances are O(N^2) memory, so large graphs use a sample of source rows
+    exact = n <= SHORTEST_PATH_MAX_NODES
+    if exact:
+        sources = None
+    else:
+        sources = np.random.default_rng(42).choice(n, SHORTEST_PATH_SAMPLES, replace=False)
+    D = shortest_path(A, unweighted=True, directed=False, indices=sources)
+    
+    # Diagonal zeros are in the sum but excluded from the pair count
+    average = D.sum() / (D.shape[0] * (n - 1))
+    diameter = int(D.max())
+    return average, diameter, exact
+
+def edge_index_array(G):
+    """(E, 2) array of edge endpoints as positions in G.nodes() order"""
+    node_index = {node: i for i, node in enumerate(G.nodes())}
+    return np.array([(node_index[u], node_index[v]) for u, v in G.edges()],
+                    dtype=np.int64).reshape(-1, 2)
+
+def graph_hash(G, *extra):
+    """Short hash of the node list, edge list, edge weights and any extra key parts"""
+    # Nodes are hashed by repr and edges by node position, so any hashable node ids work
+    h = hashlib.blake2b(repr(list(G.nodes())).encode())
+    h.update(edge_index_array(G).tobytes())
+    h.update(np.fromiter((w for _, _, w in G.edges(data='weight', default=1.0)),
+                         dtype=np.float64, count=G.number_of_edges()).tobytes())
+    for part in extra:
+        h.update(repr(part).encode())
+    return h.hexdigest()[:16]
+
+def compute_or_load_layout(G, name, fn, **params):
+    """Load cached layout positions for G, or compute them with fn(G, **params) and cache them"""
+    # The key also covers the layout parameters and which force-directed backend is active
+    backend = 'numba' if fr_layout is not None else 'networkx'
+    cache_path = CACHE_PATH / f"{name}_{graph_hash(G, sorted(params.items()), backend)}.npz"
+    nodes = list(G.nodes())
+    
+    if cache_path.exists():
+        print(f"Loading cached {name} layout: {cache_path.name}")
+        with np.load(cache_path) as cache:
+            return dict(zip(nodes, cache['pos']))
+    
+    pos = fn(G, **params)
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    np.savez(cache_path, pos=np.array([pos[node] for node in nodes]))
+    return pos
+
 def load_graph_data(filename="Ring25.net"):
     """Load graph network dataset"""
     print(f"\nLoading graph data: {filename}")
@@ -66,19 +216,24 @@ def load_graph_data(filename="Ring25.net"):
     G = parse_pajek_net_file(filepath)
     return G
 
-def visualize_spring_layout(G, output_file="graph_spring.png"):
+def draw_node_labels(G, pos):
+    """Draw node labels, skipping them for graphs too dense to read"""
+    if G.number_of_nodes() > LABEL_MAX_NODES:
+        return
+    labels = nx.get_node_attributes(G, 'label')
+    if not labels:
+        labels = {node: str(node) for node in G.nodes()}
+    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_weight='bold')
+
+def visualize_spring_layout(G, pos, degrees, output_file="graph_spring.png"):
     """Create spring (force-directed) layout visualization"""
     print("\nCreating spring layout visualization...")
     
     plt.figure(figsize=(14, 14))
     
-    # Spring layout
-    pos = nx.spring_layout(G, k=2, iterations=50, seed=42)
-    
     # Calculate node properties
-    degrees = dict(G.degree())
-    node_sizes = [300 + degrees[node] * 100 for node in G.nodes()]
-    node_colors = [degrees[node] for node in G.nodes()]
+    node_sizes = 300 + degrees * 100
+    node_colors = degrees
     
     # Draw edges
     nx.draw_networkx_edges(G, pos, alpha=0.3, width=2, edge_color='#888888')
@@ -93,10 +248,7 @@ def visualize_spring_layout(G, output_file="graph_spring.png"):
                                    linewidths=2)
     
     # Draw labels
-    labels = nx.get_node_attributes(G, 'label')
-    if not labels:
-        labels = {node: str(node) for node in G.nodes()}
-    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_weight='bold')
+    draw_node_labels(G, pos)
     
     # Add colorbar
     plt.colorbar(nodes, label='Node Degree', shrink=0.8)
@@ -107,32 +259,23 @@ def visualize_spring_layout(G, output_file="graph_spring.png"):
     plt.tight_layout()
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=SAVE_DPI, bbox_inches='tight', facecolor='white')
     print(f"Saved: {output_path}")
     plt.close()
 
-def visualize_circular_layout(G, output_file="graph_circular.png"):
+def visualize_circular_layout(G, pos, degrees, node_colors, output_file="graph_circular.png"):
     """Create circular layout visualization"""
     print("\nCreating circular layout visualization...")
     
     plt.figure(figsize=(14, 14))
     
-    # Circular layout
-    pos = nx.circular_layout(G)
-    
     # Calculate node properties
-    degrees = dict(G.degree())
-    node_sizes = [300 + degrees[node] * 100 for node in G.nodes()]
-    
-    # Calculate betweenness centrality for coloring
-    centrality = nx.betweenness_centrality(G)
-    node_colors = [centrality[node] for node in G.nodes()]
+    node_sizes = 300 + degrees * 100
     
-    # Draw edges with varying transparency based on weight
-    for edge in G.edges():
-        x = [pos[edge[0]][0], pos[edge[1]][0]]
-        y = [pos[edge[0]][1], pos[edge[1]][1]]
-        plt.plot(x, y, 'gray', alpha=0.3, linewidth=1.5)
+    # Draw all edges as a single LineCollection of (E, 2, 2) segments
+    pos_arr = np.array([pos[node] for node in G.nodes()], dtype=np.float32)
+    segments = pos_arr[edge_index_array(G)]
+    plt.gca().add_collection(LineCollection(segments, colors='gray', alpha=0.3, linewidths=1.5))
     
     # Draw nodes
     nodes = nx.draw_networkx_nodes(G, pos,
@@ -144,10 +287,7 @@ def visualize_circular_layout(G, output_file="graph_circular.png"):
                                    linewidths=2)
     
     # Draw labels
-    labels = nx.get_node_attributes(G, 'label')
-    if not labels:
-        labels = {node: str(node) for node in G.nodes()}
-    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_weight='bold')
+    draw_node_labels(G, pos)
     
     # Add colorbar
     plt.colorbar(nodes, label='Betweenness Centrality', shrink=0.8)
@@ -159,30 +299,18 @@ def visualize_circular_layout(G, output_file="graph_circular.png"):
     plt.tight_layout()
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=SAVE_DPI, bbox_inches='tight', facecolor='white')
     print(f"Saved: {output_path}")
     plt.close()
 
-def visualize_kamada_kawai_layout(G, output_file="graph_kamada_kawai.png"):
+def visualize_kamada_kawai_layout(G, pos, degrees, node_colors, output_file="graph_kamada_kawai.png"):
     """Create Kamada-Kawai layout visualization"""
     print("\nCreating Kamada-Kawai layout visualization...")
     
     plt.figure(figsize=(14, 14))
     
-    try:
-        # Kamada-Kawai layout (good for small to medium graphs)
-        pos = nx.kamada_kawai_layout(G)
-    except:
-        print("Kamada-Kawai failed, using spring layout")
-        pos = nx.spring_layout(G, seed=42)
-    
     # Calculate node properties
-    degrees = dict(G.degree())
-    node_sizes = [300 + degrees[node] * 100 for node in G.nodes()]
-    
-    # Calculate clustering coefficient for coloring
-    clustering = nx.clustering(G)
-    node_colors = [clustering[node] for node in G.nodes()]
+    node_sizes = 300 + degrees * 100
     
     # Draw edges
     nx.draw_networkx_edges(G, pos, alpha=0.3, width=2, edge_color='#888888')
@@ -197,10 +325,7 @@ def visualize_kamada_kawai_layout(G, output_file="graph_kamada_kawai.png"):
                                    linewidths=2)
     
     # Draw labels
-    labels = nx.get_node_attributes(G, 'label')
-    if not labels:
-        labels = {node: str(node) for node in G.nodes()}
-    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_weight='bold')
+    draw_node_labels(G, pos)
     
     # Add colorbar
     plt.colorbar(nodes, label='Clustering Coefficient', shrink=0.8)
@@ -211,57 +336,41 @@ def visualize_kamada_kawai_layout(G, output_file="graph_kamada_kawai.png"):
     plt.tight_layout()
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=SAVE_DPI, bbox_inches='tight', facecolor='white')
     print(f"Saved: {output_path}")
     plt.close()
 
-def visualize_interactive_network(G, output_file="graph_interactive.html"):
+def visualize_interactive_network(G, pos, degrees, output_file="graph_interactive.html"):
     """Create interactive network visualization with Plotly"""
     print("\nCreating interactive network visualization...")
     
-    # Use spring layout for positions
-    pos = nx.spring_layout(G, k=2, iterations=50, seed=42)
+    pos_arr = np.array([pos[node] for node in G.nodes()])
     
-    # Create edge trace
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    # Create edge trace: x0, x1, NaN per edge so Plotly breaks the line
+    edge_index = edge_index_array(G)
+    edge_x = np.full((len(edge_index), 3), np.nan)
+    edge_y = np.full((len(edge_index), 3), np.nan)
+    edge_x[:, :2] = pos_arr[edge_index, 0]
+    edge_y[:, :2] = pos_arr[edge_index, 1]
     
     edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
+        x=edge_x.ravel(), y=edge_y.ravel(),
         line=dict(width=1, color='#888'),
         hoverinfo='none',
         mode='lines')
     
     # Create node trace
-    node_x = []
-    node_y = []
-    node_text = []
-    node_colors = []
-    node_sizes = []
-    
-    degrees = dict(G.degree())
-    
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        
-        label = G.nodes[node].get('label', str(node))
-        degree = degrees[node]
-        node_text.append(f"Node: {label}<br>Degree: {degree}")
-        node_colors.append(degree)
-        node_sizes.append(10 + degree * 3)
+    node_labels = [label if label is not None else str(node)
+                   for node, label in G.nodes(data='label')]
+    node_text = [f"Node: {label}<br>Degree: {degree}"
+                 for label, degree in zip(node_labels, degrees.tolist())]
+    node_sizes = 10 + degrees * 3
     
     node_trace = go.Scatter(
-        x=node_x, y=node_y,
+        x=pos_arr[:, 0], y=pos_arr[:, 1],
         mode='markers+text',
         hoverinfo='text',
-        text=[G.nodes[node].get('label', str(node)) for node in G.nodes()],
+        text=node_labels,
         textposition="top center",
         textfont=dict(size=8),
         hovertext=node_text,
@@ -269,7 +378,7 @@ def visualize_interactive_network(G, output_file="graph_interactive.html"):
             showscale=True,
             colorscale='Viridis',
             size=node_sizes,
-            color=node_colors,
+            color=degrees,
             colorbar=dict(
                 title="Node<br>Degree",
                 xanchor='left'
@@ -299,7 +408,7 @@ def visualize_interactive_network(G, output_file="graph_interactive.html"):
     fig.write_html(str(output_path))
     print(f"Saved: {output_path}")
 
-def analyze_graph(G):
+def analyze_graph(G, degrees, clustering):
     """Perform basic graph analysis"""
     print("\n" + "="*60)
     print("GRAPH ANALYSIS")
@@ -307,18 +416,21 @@ def analyze_graph(G):
     
     print(f"Number of nodes: {G.number_of_nodes()}")
     print(f"Number of edges: {G.number_of_edges()}")
-    print(f"Average degree: {sum(dict(G.degree()).values()) / G.number_of_nodes():.2f}")
+    print(f"Average degree: {degrees.mean():.2f}")
     print(f"Density: {nx.density(G):.4f}")
-    print(f"Is connected: {nx.is_connected(G)}")
+    is_connected = with_backend(nx.is_connected, G)
+    print(f"Is connected: {is_connected}")
     
-    if nx.is_connected(G):
-        print(f"Average shortest path length: {nx.average_shortest_path_length(G):.2f}")
-        print(f"Diameter: {nx.diameter(G)}")
+    if is_connected:
+        average, diameter, exact = shortest_path_stats(G)
+        note = "" if exact else f" (estimated from {SHORTEST_PATH_SAMPLES} sampled sources)"
+        print(f"Average shortest path length: {average:.2f}{note}")
+        print(f"Diameter: {diameter}{note}")
     
-    print(f"Average clustering coefficient: {nx.average_clustering(G):.4f}")
+    print(f"Average clustering coefficient: {clustering.mean():.4f}")
     
     # Find most central nodes
-    degree_centrality = nx.degree_centrality(G)
+    degree_centrality = with_backend(nx.degree_centrality, G)
     top_nodes = sorted(degree_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
     print("\nTop 5 nodes by degree centrality:")
     for node, centrality in top_nodes:
@@ -334,18 +446,35 @@ def main():
     # Load data - using Ring25.net as example
     G = load_graph_data("Ring25.net")
     
+    # Node metrics shared by the analysis and every visualization
+    degrees, clustering = node_metric_arrays(G)
+    betweenness = compute_betweenness(G)
+    
     # Analyze graph
-    analyze_graph(G)
+    analyze_graph(G, degrees, clustering)
+    
+    # Layouts are computed once and cached on disk, keyed by graph, parameters and backend
+    pos_spring = compute_or_load_layout(G, "spring", spring_layout, k=2, iterations=50, seed=42)
+    pos_circular = nx.circular_layout(G)
+    pos_kamada_kawai = kamada_kawai_layout(G)
     
     # Generate visualizations
     print("\n" + "="*60)
     print("GENERATING VISUALIZATIONS")
     print("="*60)
     
-    visualize_spring_layout(G)
-    visualize_circular_layout(G)
-    visualize_kamada_kawai_layout(G)
-    visualize_interactive_network(G)
+    # The figures are independent, so render them in separate processes
+    jobs = [
+        (visualize_spring_layout, G, pos_spring, degrees),
+        (visualize_circular_layout, G, pos_circular, degrees, betweenness),
+        (visualize_kamada_kawai_layout, G, pos_kamada_kawai, degrees, clustering),
+        (visualize_interactive_network, G, pos_spring, degrees),
+    ]
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(*job) for job in jobs]
+        for future in futures:
+            future.result()
     
     print("\n" + "="*60)
     print("Graph visualizations completed!")
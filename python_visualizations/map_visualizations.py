@@ -5,14 +5,23 @@ Creates geospatial visualizations using different layouts
 
 import pandas as pd
 import matplotlib.pyplot as plt
-import plotly.express as px
 import plotly.graph_objects as go
 import geopandas as gpd
-from shapely.geometry import Point
+import shapely
 import folium
-from folium.plugins import HeatMap, MarkerCluster
+from folium.plugins import HeatMap, FastMarkerCluster
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+# Arrow-backed CSV parsing and string columns, optional
+try:
+    import pyarrow  # noqa: F401
+    ARROW_CSV_KWARGS = {'engine': 'pyarrow', 'dtype_backend': 'pyarrow'}
+except ImportError:
+    ARROW_CSV_KWARGS = {}
 
 # Set up paths
 BASE_PATH = Path(__file__).parent.parent
@@ -20,10 +29,36 @@ DATA_PATH = BASE_PATH / "datasets" / "map"
 OUTPUT_PATH = BASE_PATH / "outputs"
 OUTPUT_PATH.mkdir(exist_ok=True)
 
+# PNG resolution (override with VIZDASH_DPI) and Agg path simplification
+SAVE_DPI = int(os.environ.get('VIZDASH_DPI', 150))
+plt.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000,
+})
+
+# Leaflet callback building each cluster marker client-side from a
+# [lat, lng, popup_html, icon_color, tooltip] row
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'info-sign', markerColor: row[3], prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(row[2], {maxWidth: 250});
+    marker.bindTooltip(row[4]);
+    return marker;
+}
+"""
+
+# Half-width numeric columns for the cities table
+CITY_DTYPES = {'lat': 'float32', 'lng': 'float32', 'population': 'float32'}
+
+# Label box style for annotated cities
+BBOX_KW = dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7)
+
 def load_map_data():
     """Load world cities dataset"""
     print("Loading world cities data...")
-    df = pd.read_csv(DATA_PATH / "worldcities.csv")
+    df = pd.read_csv(DATA_PATH / "worldcities.csv", dtype=CITY_DTYPES, **ARROW_CSV_KWARGS)
     
     print(f"Loaded {len(df)} cities")
     print(f"\nDataset columns: {df.columns.tolist()}")
@@ -38,8 +73,9 @@ def load_map_data():
 
 def create_geodataframe(df):
     """Convert DataFrame to GeoDataFrame"""
-    geometry = [Point(xy) for xy in zip(df['lng'], df['lat'])]
-    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
+    # One vectorized GEOS call instead of a Point per row
+    geometry = shapely.points(df['lng'].to_numpy(), df['lat'].to_numpy())
+    gdf = gpd.GeoDataFrame(df, geometry=gpd.GeoSeries(geometry, index=df.index, crs='EPSG:4326'))
     return gdf
 
 def visualize_static_scatter_map(df, output_file="map_static_scatter.png"):
@@ -68,13 +104,16 @@ def visualize_static_scatter_map(df, output_file="map_static_scatter.png"):
     
     # Add labels for top 20 cities
     top_cities = df_filtered.nlargest(20, 'population')
-    for _, city in top_cities.iterrows():
-        ax.annotate(city['city_ascii'],
-                   xy=(city['lng'], city['lat']),
+    names = top_cities['city_ascii'].to_numpy()
+    lngs = top_cities['lng'].to_numpy()
+    lats = top_cities['lat'].to_numpy()
+    for name, lng, lat in zip(names, lngs, lats):
+        ax.annotate(name,
+                   xy=(lng, lat),
                    xytext=(5, 5),
                    textcoords='offset points',
                    fontsize=7,
-                   bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7),
+                   bbox=BBOX_KW,
                    fontweight='bold')
     
     # Colorbar
@@ -92,36 +131,40 @@ def visualize_static_scatter_map(df, output_file="map_static_scatter.png"):
     plt.tight_layout()
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=SAVE_DPI, bbox_inches='tight', facecolor='white')
     print(f"Saved: {output_path}")
     plt.close()
 
 def visualize_choropleth_map(df, output_file="map_choropleth.png"):
     """Create density map showing cities by region"""
-    print("\nCreating density/hexbin map...")
+    print("\nCreating density map...")
     
     # Filter valid coordinates
     df_filtered = df.dropna(subset=['lat', 'lng'])
     
     fig, ax = plt.subplots(figsize=(20, 12))
     
-    # Create hexbin plot (density map)
-    hexbin = ax.hexbin(df_filtered['lng'], 
-                       df_filtered['lat'],
-                       gridsize=50,
-                       cmap='YlOrRd',
-                       mincnt=1,
-                       alpha=0.8,
-                       edgecolors='none')
+    # Bin cities on a 100x50 lng/lat grid in one C-coded pass; empty cells stay transparent
+    counts, _, _ = np.histogram2d(df_filtered['lng'].to_numpy(),
+                                  df_filtered['lat'].to_numpy(),
+                                  bins=[100, 50],
+                                  range=[[-180, 180], [-90, 90]])
+    density = ax.imshow(np.ma.masked_equal(counts.T, 0),
+                        origin='lower',
+                        extent=[-180, 180, -90, 90],
+                        cmap='YlOrRd',
+                        alpha=0.8,
+                        aspect='auto',
+                        interpolation='nearest')
     
     # Colorbar
-    cbar = plt.colorbar(hexbin, ax=ax, fraction=0.03, pad=0.04)
+    cbar = plt.colorbar(density, ax=ax, fraction=0.03, pad=0.04)
     cbar.set_label('City Density', rotation=270, labelpad=20, fontsize=12)
     
     ax.set_facecolor('#e6f2ff')
     ax.set_xlabel('Longitude', fontsize=12, fontweight='bold')
     ax.set_ylabel('Latitude', fontsize=12, fontweight='bold')
-    ax.set_title('World Cities - Density Hexbin Map\nCity Distribution Across the Globe',
+    ax.set_title('World Cities - Density Map\nCity Distribution Across the Globe',
                 fontsize=16, fontweight='bold', pad=20)
     ax.set_xlim([-180, 180])
     ax.set_ylim([-90, 90])
@@ -130,7 +173,7 @@ def visualize_choropleth_map(df, output_file="map_choropleth.png"):
     plt.tight_layout()
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=SAVE_DPI, bbox_inches='tight', facecolor='white')
     print(f"Saved: {output_path}")
     plt.close()
 
@@ -142,22 +185,27 @@ def visualize_interactive_plotly_map(df, output_file="map_interactive_plotly.htm
     df_filtered = df[df['population'].notna()].copy()
     df_filtered = df_filtered[df_filtered['population'] > 500000]  # > 500k population
     
-    # Create figure
-    fig = px.scatter_geo(df_filtered,
-                        lat='lat',
-                        lon='lng',
-                        hover_name='city',
-                        hover_data={
-                            'country': True,
-                            'population': ':,',
-                            'lat': ':.2f',
-                            'lng': ':.2f'
-                        },
-                        size='population',
-                        color='population',
-                        color_continuous_scale='Viridis',
-                        size_max=30,
-                        title=f'World Cities Interactive Map<br>{len(df_filtered)} cities with population > 500K')
+    # Create figure: one Scattergeo trace fed straight from NumPy arrays
+    population = df_filtered['population'].to_numpy()
+    fig = go.Figure(go.Scattergeo(
+        lat=df_filtered['lat'].to_numpy(),
+        lon=df_filtered['lng'].to_numpy(),
+        text=df_filtered['city'].to_numpy(),
+        customdata=df_filtered['country'].to_numpy(),
+        mode='markers',
+        marker=dict(
+            size=np.clip(population / 1e5, 4, 30),
+            color=population,
+            colorscale='Viridis',
+            showscale=True,
+            colorbar=dict(title='population')
+        ),
+        hovertemplate=('<b>%{text}</b><br><br>'
+                       'country=%{customdata}<br>'
+                       'population=%{marker.color:,}<br>'
+                       'lat=%{lat:.2f}<br>'
+                       'lng=%{lon:.2f}<extra></extra>')
+    ))
     
     fig.update_layout(
         geo=dict(
@@ -171,6 +219,7 @@ def visualize_interactive_plotly_map(df, output_file="map_interactive_plotly.htm
             countrycolor='rgb(204, 204, 204)'
         ),
         title={
+            'text': f'World Cities Interactive Map<br>{len(df_filtered)} cities with population > 500K',
             'x': 0.5,
             'xanchor': 'center',
             'font': {'size': 18}
@@ -195,8 +244,10 @@ def visualize_folium_heatmap(df, output_file="map_heatmap_folium.html"):
     m = folium.Map(location=[20, 0], zoom_start=2, tiles='OpenStreetMap')
     
     # Prepare data for heatmap (lat, lng, weight)
-    heat_data = [[row['lat'], row['lng'], row['population']] 
-                 for _, row in df_filtered.iterrows() if row['population'] > 0]
+    mask = df_filtered['population'] > 0
+    # float32 columns are widened and rounded so the HTML doesn't carry rounding noise
+    heat_data = (df_filtered.loc[mask, ['lat', 'lng', 'population']]
+                 .to_numpy(dtype=np.float64).round(4).tolist())
     
     # Add heatmap layer
     HeatMap(heat_data,
@@ -232,25 +283,21 @@ def visualize_folium_cluster_map(df, output_file="map_cluster_folium.html"):
     # Create base map
     m = folium.Map(location=[20, 0], zoom_start=2, tiles='CartoDB positron')
     
-    # Create marker cluster
-    marker_cluster = MarkerCluster().add_to(m)
-    
-    # Add markers
-    for _, row in df_filtered.iterrows():
-        popup_text = f"""
-        <b>{row['city']}</b><br>
-        Country: {row['country']}<br>
-        Population: {row['population']:,.0f}<br>
-        Coordinates: ({row['lat']:.2f}, {row['lng']:.2f})
-        """
-        
-        folium.Marker(
-            location=[row['lat'], row['lng']],
-            popup=folium.Popup(popup_text, max_width=250),
-            tooltip=row['city'],
-            icon=folium.Icon(color='red' if row['capital'] == 'primary' else 'blue',
-                           icon='info-sign')
-        ).add_to(marker_cluster)
+    # Build all popup strings with vectorized string ops
+    popups = ("<b>" + df_filtered['city'].astype(str) + "</b><br>"
+              + "Country: " + df_filtered['country'].astype(str) + "<br>"
+              + "Population: " + df_filtered['population'].map('{:,.0f}'.format) + "<br>"
+              + "Coordinates: (" + df_filtered['lat'].map('{:.2f}'.format)
+              + ", " + df_filtered['lng'].map('{:.2f}'.format) + ")").tolist()
+    colors = np.where(df_filtered['capital'].isin(['primary']), 'red', 'blue').tolist()
+    
+    # Markers are created in the browser from one JSON array
+    coords = df_filtered[['lat', 'lng']].to_numpy(dtype=np.float64).round(4)
+    data = [list(row) for row in zip(coords[:, 0].tolist(),
+                                     coords[:, 1].tolist(),
+                                     popups, colors,
+                                     df_filtered['city'].astype(str).tolist())]
+    FastMarkerCluster(data, callback=CLUSTER_MARKER_CALLBACK).add_to(m)
     
     # Add title
     title_html = '''
@@ -315,11 +362,19 @@ def main():
     print("GENERATING VISUALIZATIONS")
     print("="*60)
     
-    visualize_static_scatter_map(df)
-    visualize_choropleth_map(df)
-    visualize_interactive_plotly_map(df)
-    visualize_folium_heatmap(df)
-    visualize_folium_cluster_map(df)
+    # Each map writes its own file, so render them in separate processes
+    visualizers = [
+        visualize_static_scatter_map,
+        visualize_choropleth_map,
+        visualize_interactive_plotly_map,
+        visualize_folium_heatmap,
+        visualize_folium_cluster_map,
+    ]
+    with ProcessPoolExecutor(max_workers=min(len(visualizers), os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(visualize, df) for visualize in visualizers]
+        for future in futures:
+            future.result()
     
     print("\n" + "="*60)
     print("Map visualizations completed!")
@@ -0,0 +1,76 @@
+"""
+Pajek Network Files
+Reads Pajek .net files into NetworkX graphs by scanning a memory map with compiled regexes
+"""
+
+import networkx as nx
+import numpy as np
+import mmap
+import os
+import re
+
+# Pajek section marker line (*Vertices, *Edges, *Arcs, ...)
+SECTION_RE = re.compile(rb'^[ \t]*\*[^\n]*', re.M)
+
+# Pajek vertex line: ID, then the first quoted string on the line or else the
+# next token as label; [ \t] keeps ID-only lines from borrowing the next line
+VERTEX_RE = re.compile(rb'^[ \t]*(\d+)[ \t]+(?:[^"\n]*?"([^"\n]*)"|(\S+))', re.M)
+
+# Pajek edge line: source, target and optional weight; further fields are ignored
+EDGE_RE = re.compile(rb'^[ \t]*(\d+)[ \t]+(\d+)(?!\S)(?:[ \t]+(\S+))?', re.M)
+
+def pajek_sections(buf):
+    """Yield (kind, start, end) byte ranges of the vertex and edge/arc blocks in file order"""
+    kind = None
+    start = 0
+    for marker in SECTION_RE.finditer(buf):
+        if kind is not None:
+            yield kind, start, marker.start()
+        line = marker.group().lstrip()
+        if line.startswith(b'*Vertices'):
+            kind = 'vertices'
+        elif line.startswith((b'*Edges', b'*Arcs')):
+            kind = 'edges'
+        # Any other marker leaves the current block type unchanged
+        start = marker.end()
+    if kind is not None:
+        yield kind, start, len(buf)
+
+def read_pajek(filepath, id_attribute=False):
+    """Read a Pajek .net file into an undirected graph with 'label' (and optionally 'id') node attributes"""
+    G = nx.Graph()
+
+    # An empty file cannot be memory-mapped and holds no graph
+    if os.path.getsize(filepath) == 0:
+        return G
+
+    # Memory-map the file and let the compiled regexes scan it in place
+    with open(filepath, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for kind, start, end in pajek_sections(mm):
+            if kind == 'vertices':
+                # Vertex block: ID "Label" x y z (label may be unquoted)
+                vertices = VERTEX_RE.findall(mm, start, end)
+                if not vertices:
+                    continue
+                fields = np.array(vertices)
+                ids = fields[:, 0].astype(np.int64).tolist()
+                labels = np.char.decode(np.where(fields[:, 1] == b'', fields[:, 2], fields[:, 1]),
+                                        'utf-8', errors='ignore').tolist()
+                if id_attribute:
+                    attrs = [{'label': label, 'id': node_id} for node_id, label in zip(ids, labels)]
+                else:
+                    attrs = [{'label': label} for label in labels]
+                G.add_nodes_from(zip(ids, attrs))
+            else:
+                # Edge/arc block: source target [weight]; anything after the third
+                # field (Pajek colour/width attributes) is cut off by the regex
+                edges = EDGE_RE.findall(mm, start, end)
+                if edges:
+                    fields = np.array(edges)
+                    weights = np.where(fields[:, 2] == b'', b'1', fields[:, 2]).astype(np.float64)
+                    G.add_weighted_edges_from(zip(fields[:, 0].astype(np.int64).tolist(),
+                                                  fields[:, 1].astype(np.int64).tolist(),
+                                                  weights.tolist()))
+
+    return G
@@ -5,11 +5,24 @@ Creates hierarchical visualizations using different layouts
 
 import pandas as pd
 import networkx as nx
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 from pathlib import Path
+import os
+
+# Numba-compiled subtree BFS, optional (runs as plain Python without it)
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Identity decorator used when Numba is not installed"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 # Set up paths
 BASE_PATH = Path(__file__).parent.parent
@@ -17,11 +30,29 @@ DATA_PATH = BASE_PATH / "datasets" / "tree"
 OUTPUT_PATH = BASE_PATH / "outputs"
 OUTPUT_PATH.mkdir(exist_ok=True)
 
+# PNG resolution (override with VIZDASH_DPI)
+SAVE_DPI = int(os.environ.get('VIZDASH_DPI', 150))
+
+# Fixed figure margins, used instead of a tight-bbox layout pass at save time
+# (the top margin is set per figure so the two-line title fits its height)
+FIGURE_MARGINS = dict(left=0.02, right=0.98, bottom=0.02)
+
+# Only the node columns the visualizations use, with compact flag dtypes
+NODE_COLUMNS = ['node_id', 'node_name', 'leaf_node', 'extinct']
+NODE_DTYPES = {'node_id': 'int64', 'leaf_node': 'Int8', 'extinct': 'Int8'}
+LINK_DTYPES = {'source_node_id': 'int64', 'target_node_id': 'int64'}
+
+# Node colours indexed by (extinct << 1) | leaf: internal, leaf, extinct, extinct leaf
+PALETTE = np.array(['#4dabf7', '#51cf66', '#ff6b6b', '#ff6b6b'])
+
 def load_tree_data():
     """Load tree of life dataset"""
     print("Loading tree of life data...")
-    nodes_df = pd.read_csv(DATA_PATH / "treeoflife_nodes.csv")
-    links_df = pd.read_csv(DATA_PATH / "treeoflife_links.csv")
+    nodes_df = pd.read_csv(DATA_PATH / "treeoflife_nodes.csv", usecols=NODE_COLUMNS, dtype=NODE_DTYPES)
+    links_df = pd.read_csv(DATA_PATH / "treeoflife_links.csv", usecols=list(LINK_DTYPES), dtype=LINK_DTYPES)
+    
+    # Missing flags count as "no"
+    nodes_df[['leaf_node', 'extinct']] = nodes_df[['leaf_node', 'extinct']].fillna(0)
     
     print(f"Loaded {len(nodes_df)} nodes and {len(links_df)} edges")
     print(f"\nSample nodes:\n{nodes_df.head()}")
@@ -33,80 +64,220 @@ def create_networkx_graph(nodes_df, links_df):
     """Create NetworkX directed graph from the data"""
     G = nx.DiGraph()
     
-    # Add nodes with attributes
-    for _, row in nodes_df.iterrows():
-        G.add_node(row['node_id'], 
-                   name=row['node_name'],
-                   leaf=row['leaf_node'],
-                   extinct=row['extinct'])
+    # Add nodes with attributes (bulk insert from column arrays)
+    ids = nodes_df['node_id'].tolist()
+    names = nodes_df['node_name'].tolist()
+    leaves = nodes_df['leaf_node'].tolist()
+    extincts = nodes_df['extinct'].tolist()
+    G.add_nodes_from((node_id, {'name': name, 'leaf': leaf, 'extinct': extinct})
+                     for node_id, name, leaf, extinct in zip(ids, names, leaves, extincts))
     
     # Add edges
-    for _, row in links_df.iterrows():
-        G.add_edge(row['source_node_id'], row['target_node_id'])
+    G.add_edges_from(links_df[['source_node_id', 'target_node_id']].itertuples(index=False, name=None))
     
     return G
 
-def get_subtree(G, root_node, max_depth=3):
-    """Extract a subtree starting from root_node up to max_depth"""
-    nodes_at_depth = {root_node}
-    subtree_nodes = {root_node}
-    
-    for depth in range(max_depth):
-        next_level = set()
+def children_csr(links_df):
+    """CSR children arrays: the children of node n are indices[indptr[n]:indptr[n + 1]]"""
+    links = links_df.sort_values('source_node_id', kind='stable')
+    sources = links['source_node_id'].to_numpy()
+    indices = links['target_node_id'].to_numpy()
+    n_nodes = int(max(sources.max(), indices.max())) + 1 if len(links) else 1
+    indptr = np.searchsorted(sources, np.arange(n_nodes + 1))
+    return indptr, indices
+
+@njit(cache=True)
+def bfs_subtree(indptr, indices, root, max_depth):
+    """Breadth-first walk over CSR children arrays, returning node ids and depths in visit order"""
+    n_nodes = len(indptr) - 1
+    size = max(n_nodes, root + 1)
+    visited = np.zeros(size, np.bool_)
+    order = np.empty(size, np.int64)
+    depth = np.empty(size, np.int64)
+    
+    order[0] = root
+    depth[0] = 0
+    visited[root] = True
+    head = 0
+    tail = 1
+    while head < tail:
+        node = order[head]
+        d = depth[head]
+        head += 1
+        if d >= max_depth or node >= n_nodes:
+            continue
+        for e in range(indptr[node], indptr[node + 1]):
+            child = indices[e]
+            if not visited[child]:
+                visited[child] = True
+                order[tail] = child
+                depth[tail] = d + 1
+                tail += 1
+    
+    return order[:tail], depth[:tail]
+
+def get_subtree(G, root_node, max_depth=3, csr=None):
+    """Extract a subtree starting from root_node up to max_depth, with each node's depth"""
+    if csr is not None:
+        order, depths = bfs_subtree(csr[0], csr[1], root_node, max_depth)
+        depth = dict(zip(order.tolist(), depths.tolist()))
+        return G.subgraph(depth).copy(), depth
+    
+    depth = {root_node: 0}
+    nodes_at_depth = [root_node]
+    
+    for d in range(1, max_depth + 1):
+        next_level = []
         for node in nodes_at_depth:
-            successors = set(G.successors(node))
-            next_level.update(successors)
-        subtree_nodes.update(next_level)
+            for child in G.successors(node):
+                if child not in depth:
+                    depth[child] = d
+                    next_level.append(child)
         nodes_at_depth = next_level
         if not next_level:
             break
     
-    return G.subgraph(subtree_nodes).copy()
+    return G.subgraph(depth).copy(), depth
+
+def truncate_subtree(subtree, depth, arrays, max_depth):
+    """Cut a deeper subtree (and its attribute arrays) back to max_depth without re-walking G"""
+    keep = np.fromiter((depth[n] <= max_depth for n in arrays['nodes']), dtype=bool,
+                       count=len(arrays['nodes']))
+    nodes = [n for n, k in zip(arrays['nodes'], keep) if k]
+    truncated = {key: value[keep] for key, value in arrays.items() if key != 'nodes'}
+    truncated['nodes'] = nodes
+    
+    # Nodes on the new bottom level lose their children
+    at_bottom = np.fromiter((depth[n] == max_depth for n in nodes), dtype=bool, count=len(nodes))
+    truncated['out_deg'] = np.where(at_bottom, 0, truncated['out_deg'])
+    
+    return subtree.subgraph(nodes).copy(), truncated
+
+def save_figure(fig, output_path, dpi=SAVE_DPI):
+    """Save fig; an .svg path is written as vectors with no rasterization"""
+    kwargs = {'facecolor': 'white'}
+    if output_path.suffix != '.svg':
+        kwargs['dpi'] = dpi
+    if output_path.suffix == '.png':
+        kwargs['metadata'] = {'Software': 'vizdash'}
+    fig.savefig(output_path, **kwargs)
+
+def node_attribute_arrays(G):
+    """Extract node ids plus extinct/leaf flags and degrees as parallel numpy arrays"""
+    nodes = []
+    ext = []
+    leaf = []
+    for node, data in G.nodes(data=True):
+        nodes.append(node)
+        ext.append(data.get('extinct', 0))
+        leaf.append(data.get('leaf', 0))
+    
+    in_deg = dict(G.in_degree())
+    out_deg = dict(G.out_degree())
+    return {
+        'nodes': nodes,
+        'extinct': np.asarray(ext),
+        'leaf': np.asarray(leaf),
+        'in_deg': np.fromiter((in_deg[n] for n in nodes), dtype=np.int64, count=len(nodes)),
+        'out_deg': np.fromiter((out_deg[n] for n in nodes), dtype=np.int64, count=len(nodes)),
+    }
+
+def node_type_colors(arrays):
+    """Red for extinct, green for leaf nodes, blue for internal nodes"""
+    idx = ((arrays['extinct'] == 1).astype(np.uint8) << 1) | (arrays['leaf'] == 1).astype(np.uint8)
+    return PALETTE[idx].tolist()
 
-def visualize_radial_tree(G, nodes_df, output_file="tree_radial.png"):
+def leaf_counts(G):
+    """Return each node's children and the number of leaves beneath it"""
+    children = {node: list(G.successors(node)) for node in G.nodes()}
+    leaves = {}
+    for node in reversed(list(nx.topological_sort(G))):
+        leaves[node] = sum(leaves[c] for c in children[node]) or 1
+    return children, leaves
+
+def hierarchy_pos(G, root, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5):
+    """Create top-down tree positions with widths proportional to leaf counts"""
+    # Bottom-up pass: number of leaves under each node
+    children, leaves = leaf_counts(G)
+    
+    # Top-down pass: split each node's x-interval among its children
+    pos = {}
+    stack = [(root, xcenter - width / 2, xcenter + width / 2, 0)]
+    while stack:
+        node, lo, hi, depth = stack.pop()
+        pos[node] = ((lo + hi) / 2, vert_loc - depth * vert_gap)
+        span = (hi - lo) / leaves[node]
+        for child in children[node]:
+            child_hi = lo + leaves[child] * span
+            stack.append((child, lo, child_hi, depth + 1))
+            lo = child_hi
+    
+    return pos
+
+def radial_pos(G, root):
+    """Create radial tree positions: angle by leaf count, radius by depth"""
+    children, leaves = leaf_counts(G)
+    
+    # Top-down pass: split each node's angular interval among its children
+    index = {node: i for i, node in enumerate(G.nodes())}
+    theta = np.zeros(len(index))
+    radius = np.zeros(len(index))
+    stack = [(root, 0.0, 2 * np.pi, 0)]
+    while stack:
+        node, lo, hi, depth = stack.pop()
+        theta[index[node]] = (lo + hi) / 2
+        radius[index[node]] = depth
+        span = (hi - lo) / leaves[node]
+        for child in children[node]:
+            child_hi = lo + leaves[child] * span
+            stack.append((child, lo, child_hi, depth + 1))
+            lo = child_hi
+    
+    xy = np.column_stack((radius * np.cos(theta), radius * np.sin(theta)))
+    return dict(zip(index, xy))
+
+def visualize_radial_tree(G, nodes_df, output_file="tree_radial.png", dpi=SAVE_DPI,
+                          subtree=None, arrays=None):
     """Create a radial (circular) tree layout visualization"""
     print("\nCreating radial tree visualization...")
     
-    # Get a manageable subtree (from root, depth 3)
-    subtree = get_subtree(G, 1, max_depth=3)
+    # Get a manageable subtree (from root, depth 3) unless main() shared one
+    if subtree is None:
+        subtree, _ = get_subtree(G, 1, max_depth=3)
+    if arrays is None:
+        arrays = node_attribute_arrays(subtree)
     
-    # Use hierarchical layout
-    pos = nx.spring_layout(subtree, k=2, iterations=50, seed=42)
+    # Use radial layout (angle by leaf count, radius by depth)
+    pos = radial_pos(subtree, 1)
     
     # Create figure
-    plt.figure(figsize=(16, 16))
+    fig, ax = plt.subplots(figsize=(16, 16))
     
     # Draw nodes
-    node_colors = []
-    for node in subtree.nodes():
-        if subtree.nodes[node].get('extinct', 0) == 1:
-            node_colors.append('#ff6b6b')  # Red for extinct
-        elif subtree.nodes[node].get('leaf', 0) == 1:
-            node_colors.append('#51cf66')  # Green for leaf nodes
-        else:
-            node_colors.append('#4dabf7')  # Blue for internal nodes
+    nodes = arrays['nodes']
+    node_colors = node_type_colors(arrays)
     
     # Draw edges
-    nx.draw_networkx_edges(subtree, pos, alpha=0.3, 
-                           arrows=True, arrowsize=10,
+    nx.draw_networkx_edges(subtree, pos, ax=ax, alpha=0.3, 
+                           arrows=False,
                            edge_color='gray', width=1.5)
     
-    # Draw nodes
-    nx.draw_networkx_nodes(subtree, pos, 
-                          node_color=node_colors,
-                          node_size=500, alpha=0.9,
-                          edgecolors='black', linewidths=1)
+    # Draw nodes as a single scatter collection
+    xy = np.array([pos[node] for node in nodes])
+    ax.scatter(xy[:, 0], xy[:, 1], c=node_colors, s=500, alpha=0.9,
+                edgecolors='black', linewidths=1)
     
     # Draw labels for important nodes
+    labeled = (arrays['in_deg'] == 0) | (arrays['out_deg'] > 5)
     labels = {}
-    for node in subtree.nodes():
-        if subtree.in_degree(node) == 0 or subtree.out_degree(node) > 5:
-            labels[node] = subtree.nodes[node].get('name', str(node))[:20]
+    for i in np.flatnonzero(labeled):
+        node = nodes[i]
+        labels[node] = subtree.nodes[node].get('name', str(node))[:20]
     
-    nx.draw_networkx_labels(subtree, pos, labels, font_size=8, font_weight='bold')
+    nx.draw_networkx_labels(subtree, pos, labels, ax=ax, font_size=8, font_weight='bold')
     
-    plt.title("Tree of Life - Radial Layout\n(Subset: Root to Depth 3)", 
-              fontsize=18, fontweight='bold', pad=20)
+    ax.set_title("Tree of Life - Radial Layout\n(Subset: Root to Depth 3)", 
+                 fontsize=18, fontweight='bold', pad=20)
     
     # Add legend
     legend_elements = [
@@ -117,87 +288,62 @@ def visualize_radial_tree(G, nodes_df, output_file="tree_radial.png"):
         plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#ff6b6b', 
                    markersize=10, label='Extinct')
     ]
-    plt.legend(handles=legend_elements, loc='upper right', fontsize=10)
+    ax.legend(handles=legend_elements, loc='upper right', fontsize=10)
     
-    plt.axis('off')
-    plt.tight_layout()
+    ax.axis('off')
+    fig.subplots_adjust(top=0.93, **FIGURE_MARGINS)
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    save_figure(fig, output_path, dpi=dpi)
     print(f"Saved: {output_path}")
-    plt.close()
+    plt.close(fig)
 
-def visualize_hierarchical_tree(G, nodes_df, output_file="tree_hierarchical.png"):
+def visualize_hierarchical_tree(G, nodes_df, output_file="tree_hierarchical.png", dpi=SAVE_DPI,
+                                subtree=None, arrays=None):
     """Create a hierarchical (top-down) tree layout visualization"""
     print("\nCreating hierarchical tree visualization...")
     
-    # Get a manageable subtree
-    subtree = get_subtree(G, 1, max_depth=4)
+    # Get a manageable subtree unless main() shared one
+    if subtree is None:
+        subtree, _ = get_subtree(G, 1, max_depth=4)
+    if arrays is None:
+        arrays = node_attribute_arrays(subtree)
     
     # Use hierarchical positions
-    def hierarchy_pos(G, root, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5):
-        """Create hierarchical layout positions"""
-        pos = {root: (xcenter, vert_loc)}
-        neighbors = list(G.successors(root))
-        if len(neighbors) != 0:
-            dx = width / len(neighbors)
-            nextx = xcenter - width/2 - dx/2
-            for neighbor in neighbors:
-                nextx += dx
-                pos.update(hierarchy_pos(G, neighbor, 
-                                        width=dx, vert_gap=vert_gap,
-                                        vert_loc=vert_loc-vert_gap, 
-                                        xcenter=nextx))
-        return pos
-    
-    try:
-        pos = hierarchy_pos(subtree, 1)
-    except:
-        pos = nx.spring_layout(subtree, seed=42)
+    pos = hierarchy_pos(subtree, 1)
     
     # Create figure
-    plt.figure(figsize=(20, 12))
+    fig, ax = plt.subplots(figsize=(20, 12))
     
     # Determine node colors
-    node_colors = []
-    node_sizes = []
-    for node in subtree.nodes():
-        out_degree = subtree.out_degree(node)
-        
-        if subtree.nodes[node].get('extinct', 0) == 1:
-            node_colors.append('#ff6b6b')
-        elif subtree.nodes[node].get('leaf', 0) == 1:
-            node_colors.append('#51cf66')
-        else:
-            node_colors.append('#4dabf7')
-        
-        # Size based on number of children
-        node_sizes.append(300 + out_degree * 50)
+    nodes = arrays['nodes']
+    node_colors = node_type_colors(arrays)
+    
+    # Size based on number of children
+    node_sizes = 300 + arrays['out_deg'] * 50
     
     # Draw edges
-    nx.draw_networkx_edges(subtree, pos, alpha=0.3,
-                           arrows=True, arrowsize=15,
+    nx.draw_networkx_edges(subtree, pos, ax=ax, alpha=0.3,
+                           arrows=False,
                            edge_color='gray', width=2)
     
-    # Draw nodes
-    nx.draw_networkx_nodes(subtree, pos,
-                          node_color=node_colors,
-                          node_size=node_sizes,
-                          alpha=0.9,
-                          edgecolors='black',
-                          linewidths=1.5)
+    # Draw nodes as a single scatter collection
+    xy = np.array([pos[node] for node in nodes])
+    ax.scatter(xy[:, 0], xy[:, 1], c=node_colors, s=node_sizes, alpha=0.9,
+                edgecolors='black', linewidths=1.5)
     
     # Draw labels for key nodes
+    labeled = (arrays['in_deg'] == 0) | (arrays['out_deg'] >= 3)
     labels = {}
-    for node in subtree.nodes():
-        if subtree.in_degree(node) == 0 or subtree.out_degree(node) >= 3:
-            name = subtree.nodes[node].get('name', str(node))
-            labels[node] = name[:25]
+    for i in np.flatnonzero(labeled):
+        node = nodes[i]
+        name = subtree.nodes[node].get('name', str(node))
+        labels[node] = name[:25]
     
-    nx.draw_networkx_labels(subtree, pos, labels, font_size=7, font_weight='bold')
+    nx.draw_networkx_labels(subtree, pos, labels, ax=ax, font_size=7, font_weight='bold')
     
-    plt.title("Tree of Life - Hierarchical Layout\n(Top-Down View, Depth 4)", 
-              fontsize=18, fontweight='bold', pad=20)
+    ax.set_title("Tree of Life - Hierarchical Layout\n(Top-Down View, Depth 4)", 
+                 fontsize=18, fontweight='bold', pad=20)
     
     # Legend
     legend_elements = [
@@ -208,53 +354,51 @@ def visualize_hierarchical_tree(G, nodes_df, output_file="tree_hierarchical.png"
         plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#ff6b6b',
                    markersize=12, label='Extinct')
     ]
-    plt.legend(handles=legend_elements, loc='upper right', fontsize=11)
+    ax.legend(handles=legend_elements, loc='upper right', fontsize=11)
     
-    plt.axis('off')
-    plt.tight_layout()
+    ax.axis('off')
+    fig.subplots_adjust(top=0.90, **FIGURE_MARGINS)
     
     output_path = OUTPUT_PATH / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    save_figure(fig, output_path, dpi=dpi)
     print(f"Saved: {output_path}")
-    plt.close()
+    plt.close(fig)
 
-def visualize_sunburst_interactive(G, nodes_df, output_file="tree_sunburst.html"):
+def visualize_sunburst_interactive(G, nodes_df, output_file="tree_sunburst.html",
+                                   subtree=None, arrays=None):
     """Create an interactive sunburst diagram"""
     print("\nCreating interactive sunburst visualization...")
     
-    # Get a manageable subtree
-    subtree = get_subtree(G, 1, max_depth=5)
+    # Get a manageable subtree unless main() shared one
+    if subtree is None:
+        subtree, _ = get_subtree(G, 1, max_depth=5)
+    if arrays is None:
+        arrays = node_attribute_arrays(subtree)
+    
+    # Parents and subtree sizes in one bottom-up pass (no per-node descendants BFS)
+    parent_of = {v: u for u, v in subtree.edges()}
+    subtree_size = {}
+    for node in reversed(list(nx.topological_sort(subtree))):
+        subtree_size[node] = 1 + sum(subtree_size[c] for c in subtree.successors(node))
     
     # Build hierarchical data for sunburst
     ids = []
     labels = []
     parents = []
     values = []
-    colors = []
+    colors = node_type_colors(arrays)
     
-    for node in subtree.nodes():
+    for node in arrays['nodes']:
         node_name = subtree.nodes[node].get('name', str(node))
         ids.append(str(node))
         labels.append(node_name[:30])
         
         # Find parent
-        predecessors = list(subtree.predecessors(node))
-        if predecessors:
-            parents.append(str(predecessors[0]))
-        else:
-            parents.append("")
+        parent = parent_of.get(node)
+        parents.append(str(parent) if parent is not None else "")
         
         # Value based on number of descendants
-        descendants = len(list(nx.descendants(subtree, node)))
-        values.append(descendants + 1)
-        
-        # Color based on node type
-        if subtree.nodes[node].get('extinct', 0) == 1:
-            colors.append('#ff6b6b')
-        elif subtree.nodes[node].get('leaf', 0) == 1:
-            colors.append('#51cf66')
-        else:
-            colors.append('#4dabf7')
+        values.append(subtree_size[node])
     
     fig = go.Figure(go.Sunburst(
         ids=ids,
@@ -266,6 +410,9 @@ def visualize_sunburst_interactive(G, nodes_df, output_file="tree_sunburst.html"
         hovertemplate='<b>%{label}</b><br>Descendants: %{value}<extra></extra>'
     ))
     
+    # Only draw two rings at a time; deeper levels open on click
+    fig.update_traces(maxdepth=2)
+    
     fig.update_layout(
         title={
             'text': "Tree of Life - Interactive Sunburst Diagram",
@@ -295,10 +442,16 @@ def main():
     G = create_networkx_graph(nodes_df, links_df)
     print(f"\nGraph created: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
     
+    # Walk the deepest subtree once; the shallower views are cut from it
+    subtree5, depth = get_subtree(G, 1, max_depth=5, csr=children_csr(links_df))
+    arrays5 = node_attribute_arrays(subtree5)
+    subtree4, arrays4 = truncate_subtree(subtree5, depth, arrays5, 4)
+    subtree3, arrays3 = truncate_subtree(subtree5, depth, arrays5, 3)
+    
     # Generate visualizations
-    visualize_radial_tree(G, nodes_df)
-    visualize_hierarchical_tree(G, nodes_df)
-    visualize_sunburst_interactive(G, nodes_df)
+    visualize_radial_tree(G, nodes_df, subtree=subtree3, arrays=arrays3)
+    visualize_hierarchical_tree(G, nodes_df, subtree=subtree4, arrays=arrays4)
+    visualize_sunburst_interactive(G, nodes_df, subtree=subtree5, arrays=arrays5)
     
     print("\n" + "="*60)
     print("Tree visualizations completed!")
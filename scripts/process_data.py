@@ -2,36 +2,143 @@ import pandas as pd
 import networkx as nx
 import json
 import os
+import sys
 from pathlib import Path
-import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# Pajek parsing is shared with the graph visualizations, whose modules import each
+# other from python_visualizations/; put that directory on the path here as well
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "python_visualizations"))
+from pajek import read_pajek  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# GPU betweenness through the nx-cugraph NetworkX backend, optional
+# (pip install nx-cugraph-cu12)
+try:
+    import nx_cugraph  # noqa: F401
+    GRAPH_BACKEND = 'cugraph'
+except ImportError:
+    GRAPH_BACKEND = None
+
+# Source nodes sampled for CPU betweenness, O(kE) instead of O(VE)
+BETWEENNESS_SAMPLES = 500
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 DATASETS_DIR = BASE_DIR / "datasets"
 OUTPUT_DIR = BASE_DIR / "dashboard" / "public" / "data"
 
+# Columns read from the source CSVs (confidence is optional in the tree nodes)
+TREE_NODE_COLUMNS = {'node_id', 'node_name', 'leaf_node', 'extinct', 'confidence'}
+TREE_NODE_DTYPES = {'node_id': 'int64', 'leaf_node': 'Int8', 'extinct': 'Int8'}
+TREE_LINK_DTYPES = {'source_node_id': 'int64', 'target_node_id': 'int64'}
+CITY_COLUMNS = ['city', 'country', 'population', 'capital', 'iso2', 'iso3', 'lat', 'lng']
+
+# tree.json keys shared by every node record
+NAME_KEY = 'name'
+LEAF_KEY = 'leaf'
+EXTINCT_KEY = 'extinct'
+CONFIDENCE_KEY = 'confidence'
+
 # Ensure output directory exists
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+def _json_default(obj):
+    """Convert numpy scalars and arrays for the stdlib json fallback"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_json(obj):
+    """Serialize obj to UTF-8 bytes with orjson, falling back to the stdlib json module"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default).encode('utf-8')
+
+def write_json(path, obj):
+    """Serialize obj to path in a single write"""
+    with open(path, "wb") as f:
+        f.write(dumps_json(obj))
+
+def write_tree_json(path, root_id, nodes_dict, children_map, max_depth=3):
+    """Stream the nested tree to path depth-first without building it in memory"""
+    with open(path, "wb", buffering=1 << 20) as f:
+        if root_id not in nodes_dict:
+            f.write(b"null")
+            return
+        
+        # Stack holds nodes still to write and raw bytes (separators, closers) in between
+        stack = [(root_id, 0)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, bytes):
+                f.write(item)
+                continue
+            
+            node_id, depth = item
+            node = nodes_dict[node_id]
+            # Encode name + attributes, leaving the object open for children/value
+            head = dumps_json({NAME_KEY: node[NAME_KEY], **node['attributes']})[:-1]
+            
+            # Stop at max_depth
+            children = []
+            if depth < max_depth:
+                children = [c for c in children_map.get(node_id, ()) if c in nodes_dict]
+            if not children:
+                f.write(head + b',"value":1}')
+                continue
+            
+            f.write(head + b',"children":[')
+            stack.append(b"]}")
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((children[i], depth + 1))
+                if i:
+                    stack.append(b",")
+
 def process_tree_data():
     print("Processing Tree Data...")
     nodes_path = DATASETS_DIR / "tree" / "treeoflife_nodes.csv"
     links_path = DATASETS_DIR / "tree" / "treeoflife_links.csv"
     
-    nodes_df = pd.read_csv(nodes_path)
-    links_df = pd.read_csv(links_path)
+    nodes_df = pd.read_csv(nodes_path, usecols=lambda c: c in TREE_NODE_COLUMNS, dtype=TREE_NODE_DTYPES)
+    links_df = pd.read_csv(links_path, usecols=list(TREE_LINK_DTYPES), dtype=TREE_LINK_DTYPES)
+    
+    # Missing flags count as "no"
+    nodes_df[['leaf_node', 'extinct']] = nodes_df[['leaf_node', 'extinct']].fillna(0)
+    
+    # Build a dictionary of nodes for quick lookup, zipping whole columns
+    # instead of boxing every row into an object Series
+    # (leaf/extinct are only stored when true and confidence only when known;
+    # an absent key means false/unknown in tree.json)
+    leaves = nodes_df['leaf_node'].to_numpy(dtype=bool).tolist()
+    extinct = nodes_df['extinct'].to_numpy(dtype=bool).tolist()
+    if 'confidence' in nodes_df:
+        confidences = nodes_df['confidence'].tolist()
+    else:
+        confidences = [None] * len(nodes_df)
     
-    # Build a dictionary of nodes for quick lookup
     nodes_dict = {}
-    for _, row in nodes_df.iterrows():
-        nodes_dict[row['node_id']] = {
-            "name": row['node_name'],
-            "attributes": {
-                "leaf": bool(row['leaf_node']),
-                "extinct": bool(row['extinct']),
-                "confidence": row.get('confidence', None)
-            },
-            "children": []
+    for node_id, name, is_leaf, is_extinct, confidence in zip(
+            nodes_df['node_id'].tolist(), nodes_df['node_name'].tolist(),
+            leaves, extinct, confidences):
+        attributes = {}
+        if is_leaf:
+            attributes[LEAF_KEY] = True
+        if is_extinct:
+            attributes[EXTINCT_KEY] = True
+        if pd.notna(confidence):
+            attributes[CONFIDENCE_KEY] = confidence
+        nodes_dict[node_id] = {
+            NAME_KEY: name,
+            "attributes": attributes
         }
     
     # Build hierarchy
@@ -52,41 +159,9 @@ def process_tree_data():
     # For simplicity, we'll build the tree starting from these roots.
     # If multiple roots, we can create a dummy super-root or just take the first one (often 'Life')
     
-    # Helper to build recursive tree
-    def build_subtree(node_id, current_depth=0, max_depth=3):
-        node = nodes_dict.get(node_id)
-        if not node:
-            return None
-        
-        # Stop at max_depth
-        if current_depth >= max_depth:
-             return {
-                "name": node['name'],
-                **node['attributes'],
-                "value": 1
-            }
-
-        # specific to this dataset: find children
-        children_ids = links_df[links_df['source_node_id'] == node_id]['target_node_id'].tolist()
-        
-        children = []
-        for child_id in children_ids:
-            child_node = build_subtree(child_id, current_depth + 1, max_depth)
-            if child_node:
-                children.append(child_node)
-        
-        result = {
-            "name": node['name'],
-            **node['attributes'],
-        }
-        
-        if children:
-            result["children"] = children
-        else:
-            result["value"] = 1 
-            
-        return result
-
+    # Children of every node, grouped once instead of scanning links_df per node
+    children_map = links_df.groupby('source_node_id', sort=False)['target_node_id'].agg(list).to_dict()
+    
     # Assuming node 1 is the main root based on previous analysis (Life on Earth)
     # If uncertain, we can use the potential_roots
     root_id = 1
@@ -96,50 +171,23 @@ def process_tree_data():
     
     # Reduced depth for performance (was full tree ~36k nodes)
     print("Building subtree with max_depth=3...")
-    tree_data = build_subtree(root_id, max_depth=3)
-    
-    with open(OUTPUT_DIR / "tree.json", "w") as f:
-        json.dump(tree_data, f)
+    write_tree_json(OUTPUT_DIR / "tree.json", root_id, nodes_dict, children_map, max_depth=3)
     print("Tree data saved to tree.json")
 
-def parse_pajek_net_file(filepath):
-    """Simple parser for Pajek .net files (reused logic)"""
-    G = nx.Graph()
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-    
-    mode = None
-    for line in lines:
-        line = line.strip()
-        if line.startswith('*Vertices'):
-            mode = 'vertices'
-            continue
-        elif line.startswith('*Edges') or line.startswith('*Arcs'):
-            mode = 'edges'
-            continue
-        
-        if mode == 'vertices' and line:
-            parts = line.split()
-            if len(parts) >= 2:
-                node_id = int(parts[0])
-                label_match = re.search(r'"([^"]*)"', line)
-                label = label_match.group(1) if label_match else parts[1]
-                G.add_node(node_id, label=label, id=node_id)
-        
-        elif mode == 'edges' and line:
-            parts = line.split()
-            if len(parts) >= 2:
-                source = int(parts[0])
-                target = int(parts[1])
-                weight = float(parts[2]) if len(parts) > 2 else 1.0
-                G.add_edge(source, target, weight=weight)
-    return G
+def compute_betweenness(G):
+    """Exact betweenness on the cuGraph backend when installed, else sampled on CPU"""
+    if GRAPH_BACKEND is not None:
+        try:
+            return nx.betweenness_centrality(G, backend=GRAPH_BACKEND)
+        except NotImplementedError:
+            pass
+    return nx.betweenness_centrality(G, k=min(BETWEENNESS_SAMPLES, len(G)), seed=42)
 
 def process_graph_data():
     print("Processing Graph Data...")
     net_path = DATASETS_DIR / "graph" / "Ring25.net"
     
-    G = parse_pajek_net_file(net_path)
+    G = read_pajek(net_path, id_attribute=True)
     
     # Calculate layout positions (Spring) - pre-calculating can save frontend effort, 
     # but react-force-graph usually handles it. 
@@ -148,8 +196,8 @@ def process_graph_data():
     # Add some centrality metrics
     degree = dict(G.degree())
     try:
-        betweenness = nx.betweenness_centrality(G)
-    except:
+        betweenness = compute_betweenness(G)
+    except Exception:
         betweenness = {}
     
     nodes = []
@@ -175,14 +223,13 @@ def process_graph_data():
         "links": links
     }
     
-    with open(OUTPUT_DIR / "network.json", "w") as f:
-        json.dump(graph_data, f)
+    write_json(OUTPUT_DIR / "network.json", graph_data)
     print("Graph data saved to network.json")
 
 def process_map_data():
     print("Processing Map Data...")
     csv_path = DATASETS_DIR / "map" / "worldcities.csv"
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(csv_path, usecols=CITY_COLUMNS)
     
     # Filter for major cities to keep file size manageable for frontend
     # INCREASED THRESHOLD: Population > 1,000,000 or capitals (was 100k)
@@ -196,49 +243,59 @@ def process_map_data():
     
     print(f"Filtered map cities from {len(df)} to {len(major_cities)}")
     
-    features = []
-    for _, row in major_cities.iterrows():
-        feature = {
+    # Replace NaN with None in every text column at once, then convert in one pass
+    text_cols = ['city', 'country', 'capital', 'iso2', 'iso3']
+    major_cities[text_cols] = major_cities[text_cols].astype(object).where(
+        major_cities[text_cols].notna(), None
+    )
+    records = major_cities[
+        ['lng', 'lat', 'city', 'country', 'population', 'capital', 'iso2', 'iso3']
+    ].to_dict('records')
+    
+    features = [
+        {
             "type": "Feature",
             "geometry": {
                 "type": "Point",
-                "coordinates": [row['lng'], row['lat']]
+                "coordinates": [r['lng'], r['lat']]
             },
             "properties": {
-                "city": row['city'],
-                "country": row['country'],
-                "population": row['population'],
-                "capital": row['capital'] if pd.notna(row['capital']) else None,
-                "iso2": row['iso2'] if pd.notna(row['iso2']) else None,
-                "iso3": row['iso3'] if pd.notna(row['iso3']) else None
+                k: r[k] for k in ('city', 'country', 'population', 'capital', 'iso2', 'iso3')
             }
         }
-        features.append(feature)
+        for r in records
+    ]
         
     geojson = {
         "type": "FeatureCollection",
         "features": features
     }
     
-    with open(OUTPUT_DIR / "cities.json", "w") as f: # standard json extension often easier
-        json.dump(geojson, f)
+    write_json(OUTPUT_DIR / "cities.json", geojson)
     print("Map data saved to cities.json")
 
-def main():
-    try:
-        process_tree_data()
-    except Exception as e:
-        print(f"Error processing tree: {e}")
-        
+def run_stage(name, stage):
+    """Run one processing stage, reporting its error instead of raising"""
     try:
-        process_graph_data()
+        stage()
     except Exception as e:
-        print(f"Error processing graph: {e}")
-        
-    try:
-        process_map_data()
-    except Exception as e:
-        print(f"Error processing map: {e}")
+        print(f"Error processing {name}: {e}")
+
+def main():
+    # The stages read and write disjoint files, so run them in separate processes
+    stages = [
+        ("tree", process_tree_data),
+        ("graph", process_graph_data),
+        ("map", process_map_data),
+    ]
+    with ProcessPoolExecutor(max_workers=min(len(stages), os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {executor.submit(run_stage, name, stage): name for name, stage in stages}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error processing {futures[future]}: {e}")
 
 if __name__ == "__main__":
     main()